@@ -0,0 +1,162 @@
+"""/today 처리 경로(bot.fetch_sections + bot.render_view)의 로깅 비용을 동시 요청(버스트) 상황에서 측정합니다.
+
+외부 API(구글 캘린더, Todoist, 기상청)는 가짜 응답으로 대체하고, 로깅 설정만 바꿔 가며
+로깅을 끈 경우와 비교합니다. 큐 리스너 스레드가 남은 로그를 모두 출력할 때까지를 전체 시간에 포함합니다.
+조회는 실제 봇과 같이 bot.fetch_off_loop를 거쳐 스레드에서 실행됩니다.
+
+"느린 출력" 케이스는 쓰기마다 SLOW_WRITE_SECONDS씩 걸리는 출력 대상(막힌 파이프, 원격 로그 수집기 등)을
+흉내 내어, 동기 출력과 큐(LOG_ASYNC=1)의 차이가 나타나는 상황을 보여 줍니다.
+
+사용법: python bench_logging.py [요청 수]
+"""
+import asyncio
+import datetime
+import logging
+import os
+import statistics
+import sys
+import tempfile
+import time
+import types
+
+# bot 모듈은 import 시점에 필수 환경 변수를 확인하므로 가짜 값을 채워 둠
+for name in ("TELEGRAM_BOT_TOKEN", "TODOIST_API_TOKEN", "WEATHER_API_KEY"):
+    os.environ.setdefault(name, "bench")
+
+import bot
+from log_utils import setup_logging, shutdown_logging
+
+# 업스트림 오류 시 돌아오는 응답 본문 크기 (대략적인 기상청/Todoist 오류 페이지)
+ERROR_BODY = "<html>" + "x" * 50_000 + "</html>"
+ERROR_EVERY = 10  # Todoist 요청 10개 중 1개는 오류 응답
+SLOW_WRITE_SECONDS = 0.001  # 느린 출력 대상의 쓰기 한 번당 지연
+
+
+class SlowStream:
+    """쓰기마다 지연이 생기는 출력 대상 (실제 내용은 감싼 스트림에 기록)."""
+
+    def __init__(self, stream):
+        self.stream = stream
+
+    def write(self, text):
+        time.sleep(SLOW_WRITE_SECONDS)
+        return self.stream.write(text)
+
+    def flush(self):
+        self.stream.flush()
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None, text=""):
+        self.status_code = status_code
+        self._payload = payload
+        self.text = text
+
+    def json(self):
+        return self._payload
+
+
+def build_weather_payload():
+    now = datetime.datetime.now(bot.pytz.timezone('Asia/Seoul'))
+    items = []
+    for day in (now, now + datetime.timedelta(days=1)):
+        for hour in range(24):
+            for category, value in (("TMP", "18"), ("SKY", "1"), ("PTY", "0"), ("POP", "20")):
+                items.append({
+                    "fcstDate": day.strftime("%Y%m%d"),
+                    "fcstTime": f"{hour:02d}00",
+                    "category": category,
+                    "fcstValue": value,
+                })
+    return {"response": {"header": {"resultCode": "00"}, "body": {"items": {"item": items}}}}
+
+
+def install_fake_upstreams():
+    weather_payload = build_weather_payload()
+    today = datetime.datetime.now(bot.pytz.timezone('Asia/Seoul')).strftime("%Y-%m-%d")
+    tasks = [{"content": f"작업 {i}", "priority": i % 4 + 1, "due": {"date": today}} for i in range(20)]
+    calls = {"todoist": 0}
+
+    def fake_get(url, headers=None, params=None, timeout=None):
+        if url.startswith(bot.WEATHER_API_URL):
+            return FakeResponse(200, weather_payload)
+        calls["todoist"] += 1
+        if calls["todoist"] % ERROR_EVERY == 0:
+            return FakeResponse(502, text=ERROR_BODY)
+        return FakeResponse(200, tasks)
+
+    events = [{"start": {"dateTime": f"{today}T{10 + i}:00:00+09:00"}, "summary": f"회의 {i}"} for i in range(5)]
+    request = types.SimpleNamespace(execute=lambda: {"items": events})
+    service = types.SimpleNamespace(events=lambda: types.SimpleNamespace(list=lambda **kwargs: request))
+
+    bot.requests = types.SimpleNamespace(get=fake_get)
+    bot.get_calendar_service = lambda: service
+
+
+async def burst(requests):
+    latencies = []
+
+    async def handle():
+        await asyncio.sleep(0)  # 다른 요청과 번갈아 실행되도록 양보
+        start = time.perf_counter()
+        sections = await bot.fetch_sections("today")
+        bot.render_view("today", sections)
+        latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(handle() for _ in range(requests)))
+    return latencies
+
+
+def configure(stream, case):
+    logging.disable(logging.NOTSET)
+    if case == "off":
+        logging.disable(logging.CRITICAL)
+        return
+    case = dict(case)
+    if case.pop("slow", False):
+        stream = SlowStream(stream)
+    setup_logging(stream=stream, **case)
+
+
+def run_case(name, case, requests):
+    with tempfile.TemporaryFile("w+", encoding="utf-8") as stream:
+        configure(stream, case)
+        start = time.perf_counter()
+        latencies = asyncio.run(burst(requests))
+        # 큐에 남은 로그를 모두 출력할 때까지 포함
+        shutdown_logging()
+        wall = time.perf_counter() - start
+        log_bytes = stream.tell()
+
+    latencies.sort()
+    p50 = statistics.median(latencies) * 1e6
+    p99 = latencies[int(len(latencies) * 0.99) - 1] * 1e6
+    print(f"{name:<26} p50 {p50:8.1f}µs  p99 {p99:8.1f}µs  전체 {wall * 1e3:8.1f}ms  로그 {log_bytes / 1024:9.1f}KB")
+    return wall
+
+
+def main():
+    requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    install_fake_upstreams()
+    print(f"/today 로깅 벤치마크 (동시 요청 {requests}개, 전체 시간은 로그 출력 완료까지)")
+    # 첫 실행의 임포트/캐시 비용이 측정에 섞이지 않도록 한 번 미리 실행
+    logging.disable(logging.CRITICAL)
+    asyncio.run(burst(requests))
+    baseline = run_case("로깅 끔", "off", requests)
+    cases = [
+        ("동기 출력 (기본값)", {"use_queue": False}),
+        ("큐", {"use_queue": True}),
+        ("큐 + 샘플링 10", {"use_queue": True, "sample_rate": 10}),
+        ("JSON + 큐 + 샘플링 10", {"use_queue": True, "sample_rate": 10, "log_format": "json"}),
+        ("느린 출력: 동기", {"use_queue": False, "slow": True}),
+        ("느린 출력: 큐", {"use_queue": True, "slow": True}),
+        ("느린 출력: 큐 + 샘플링 10", {"use_queue": True, "sample_rate": 10, "slow": True}),
+    ]
+    for name, case in cases:
+        wall = run_case(name, case, requests)
+        print(f"{'':<26} 로깅 추가 비용: 요청당 {(wall - baseline) / requests * 1e6:7.1f}µs")
+    logging.disable(logging.NOTSET)
+
+
+if __name__ == "__main__":
+    main()
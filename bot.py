@@ -1,14 +1,23 @@
 import logging
-from telegram import Update
-from telegram.ext import ApplicationBuilder, CommandHandler, ContextTypes, MessageHandler, filters
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, InlineQueryResultArticle, InputTextMessageContent, Update
+from telegram.error import BadRequest
+from telegram.ext import ApplicationBuilder, CallbackQueryHandler, CommandHandler, ContextTypes, InlineQueryHandler, MessageHandler, filters
 import os # 추가
+import re
+import asyncio
 import datetime
 import pytz
 from google.oauth2 import service_account
 from googleapiclient.discovery import build
 import requests
 import json
+import socket
+import sqlite3
+import threading
+import time
 import xml.etree.ElementTree as ET
+from log_utils import Truncated, setup_logging
+import profiling
 
 # PRD에서 가져온 API 키 및 설정값 (Heroku Config Vars 사용 권장)
 TELEGRAM_BOT_TOKEN = os.environ.get("TELEGRAM_BOT_TOKEN")
@@ -20,11 +29,57 @@ WEATHER_API_URL = "http://apis.data.go.kr/1360000/VilageFcstInfoService_2.0" # 
 WEATHER_API_KEY = os.environ.get("WEATHER_API_KEY")
 DEFAULT_WEATHER_LOCATION = os.environ.get("DEFAULT_WEATHER_LOCATION", "경상남도 창원시 성산구") # 기본값 설정 가능
 GOOGLE_CREDENTIALS_JSON = os.environ.get("GOOGLE_CREDENTIALS_JSON")  # 서비스 계정 JSON 내용
+BOT_DB_PATH = os.environ.get("BOT_DB_PATH", "jpgn_bot.sqlite3")  # 채팅방별 설정 저장용 SQLite 파일
+DEFAULT_MORNING_BRIEFING_TIME = os.environ.get("DEFAULT_MORNING_BRIEFING_TIME", "08:00")
+DEFAULT_EVENING_BRIEFING_TIME = os.environ.get("DEFAULT_EVENING_BRIEFING_TIME", "20:00")
+BRIEFING_CATCHUP_MINUTES = 10  # 스케줄러 지연 시 보충 전송할 최대 분 수
+
+# 실행 모드 설정
+# polling: 단일 프로세스가 getUpdates로 업데이트를 받음 (기본값)
+# webhook: 여러 워커 프로세스가 로드밸런서 뒤에서 웹훅 요청을 나눠 처리
+#          브리핑 전송은 BOT_DB_PATH를 공유하는 워커 중 리더 하나만 담당
+#
+# 여러 워커 배포 방법
+# - 모든 워커가 같은 BOT_DB_PATH 파일을 써야 함 (같은 호스트의 로컬 디스크 또는 잠금이 동작하는 공유 파일시스템)
+#   Heroku처럼 dyno마다 파일시스템이 따로인 환경에서는 dyno 하나 안에서만 여러 워커를 띄울 수 있음
+#   (dyno를 늘리면 dyno마다 리더가 생겨 브리핑이 중복 전송됨)
+# - Procfile의 web: 항목(launcher.py)이 $PORT에서 웹훅을 받아 BOT_WORKERS개의 워커에 채팅방별로 나눠 전달
+#   필요한 값: WEBHOOK_URL(앱의 외부 주소), WEBHOOK_SECRET_TOKEN, BOT_WORKERS (web=1, worker=0으로 실행)
+# - 직접 구성할 경우: 워커마다 BOT_MODE=webhook, WEBHOOK_LISTEN=127.0.0.1, 서로 다른 PORT(예: 8444, 8445)로 실행하고
+#   nginx 등 로드밸런서가 WEBHOOK_PATH 요청을 워커 포트들로 나눠 보내도록 설정
+# - polling(worker:)과 webhook(web:)은 동시에 실행할 수 없음 (텔레그램이 둘 중 하나만 허용)
+BOT_MODE = os.environ.get("BOT_MODE", "polling")
+WEBHOOK_URL = os.environ.get("WEBHOOK_URL")  # 외부에서 접근 가능한 기본 URL (예: https://example.com)
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "telegram")
+WEBHOOK_LISTEN = os.environ.get("WEBHOOK_LISTEN", "0.0.0.0")
+WEBHOOK_PORT = int(os.environ.get("PORT", "8443"))
+WEBHOOK_SECRET_TOKEN = os.environ.get("WEBHOOK_SECRET_TOKEN")  # 웹훅 모드 필수 (텔레그램이 보낸 요청인지 확인)
+CACHE_REFRESH_SECONDS = int(os.environ.get("CACHE_REFRESH_SECONDS", "600"))  # 인라인 조회용 캐시 갱신 주기
+UPSTREAM_TIMEOUT_SECONDS = int(os.environ.get("UPSTREAM_TIMEOUT_SECONDS", "10"))  # 외부 API 요청 제한 시간
+LEADER_LEASE_SECONDS = int(os.environ.get("LEADER_LEASE_SECONDS", "90"))  # 브리핑 틱(60초)보다 길어야 함
+WORKER_ID = f"{socket.gethostname()}:{os.getpid()}"
 
 # 로깅 설정
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
+# LOG_FORMAT=json 이면 한 줄 JSON으로 출력, LOG_SAMPLE_RATE=N 이면 고빈도 로그는 N개 중 1개만 기록
+LOG_LEVEL = os.environ.get("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.environ.get("LOG_FORMAT", "text")
+LOG_SAMPLE_RATE = int(os.environ.get("LOG_SAMPLE_RATE", "1"))
+LOG_PAYLOAD_LIMIT = int(os.environ.get("LOG_PAYLOAD_LIMIT", "500"))  # 응답 본문 등 로그에 남길 최대 글자 수
+LOG_ASYNC = os.environ.get("LOG_ASYNC", "0") == "1"  # 로그 출력을 별도 스레드에서 처리 (출력 대상이 느릴 때만 이득, bench_logging.py 참고)
+
+# 프로파일링 설정 (PROFILE_MODE를 지정하면 시작 직후 PROFILE_SECONDS 동안 측정)
+# 관리자(ADMIN_USER_IDS)는 /profile 명령어로 재배포 없이 측정 구간을 시작할 수 있음
+PROFILE_MODE = os.environ.get("PROFILE_MODE")  # cpu | alloc | all
+PROFILE_SECONDS = int(os.environ.get("PROFILE_SECONDS", "60"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "profiles")
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", "0.01"))  # 스택 샘플링 간격(초)
+ADMIN_USER_IDS = {int(user_id.strip()) for user_id in os.environ.get("ADMIN_USER_IDS", "").split(",") if user_id.strip()}
+
+setup_logging(
+    level=LOG_LEVEL,
+    log_format=LOG_FORMAT,
+    sample_rate=LOG_SAMPLE_RATE,
+    use_queue=LOG_ASYNC
 )
 logger = logging.getLogger(__name__)
 
@@ -65,11 +120,13 @@ def get_calendar_service():
         return service
     
     except Exception as e:
-        logger.error(f"Google Calendar API 서비스 생성 중 오류 발생: {e}")
+        logger.error("Google Calendar API 서비스 생성 중 오류 발생: %s", e)
         return None
 
 # --- 서비스 연동 함수 (나중에 구현) ---
-async def get_google_calendar_events(date_type: str):
+# 내부에서 blocking 호출(requests, Google API 클라이언트)을 하므로 일반 함수로 두고
+# 이벤트 루프에서는 fetch_off_loop를 통해 스레드에서 실행합니다.
+def get_google_calendar_events(date_type: str):
     service = get_calendar_service()
     if not service:
         return "구글 캘린더 연동에 실패했습니다. 관리자에게 문의하세요."
@@ -112,7 +169,7 @@ async def get_google_calendar_events(date_type: str):
     end_time_iso = end_time.isoformat()
     
     try:
-        logger.info(f"구글 캘린더 정보 요청: {date_type} ({start_time_iso} ~ {end_time_iso})")
+        logger.info("구글 캘린더 정보 요청: %s (%s ~ %s)", date_type, start_time_iso, end_time_iso, extra={"sampled": True})
         
         # 이벤트 검색 실행
         events_result = service.events().list(
@@ -145,10 +202,10 @@ async def get_google_calendar_events(date_type: str):
         return "\n".join(event_list)
     
     except Exception as e:
-        logger.error(f"구글 캘린더 이벤트 조회 중 오류 발생: {e}")
+        logger.error("구글 캘린더 이벤트 조회 중 오류 발생: %s", e)
         return f"구글 캘린더 정보를 가져오는 중 오류가 발생했습니다: {str(e)}"
 
-async def get_todoist_tasks(date_type: str):
+def get_todoist_tasks(date_type: str):
     if not TODOIST_API_TOKEN:
         return "Todoist API 토큰이 설정되지 않았습니다. 관리자에게 문의하세요."
     
@@ -167,10 +224,10 @@ async def get_todoist_tasks(date_type: str):
             # 프로젝트 ID가 있으면 해당 프로젝트의 오늘 마감 작업만 필터링
             if TODOIST_PROJECT_ID:
                 # REST API를 통해 모든 작업을 가져온 후 수동으로 필터링
-                response = requests.get(TODOIST_API_URL, headers=headers)
+                response = requests.get(TODOIST_API_URL, headers=headers, timeout=UPSTREAM_TIMEOUT_SECONDS)
                 
                 if response.status_code != 200:
-                    logger.error(f"Todoist API 오류: {response.status_code}, {response.text}")
+                    logger.error("Todoist API 오류: %s, %s", response.status_code, Truncated(response.text, LOG_PAYLOAD_LIMIT))
                     return f"Todoist API 요청 중 오류가 발생했습니다. 상태 코드: {response.status_code}"
                 
                 all_tasks = response.json()
@@ -197,11 +254,12 @@ async def get_todoist_tasks(date_type: str):
                 response = requests.get(
                     TODOIST_API_URL,
                     headers=headers,
-                    params={"filter": "today"}
+                    params={"filter": "today"},
+                    timeout=UPSTREAM_TIMEOUT_SECONDS
                 )
                 
                 if response.status_code != 200:
-                    logger.error(f"Todoist API 오류: {response.status_code}, {response.text}")
+                    logger.error("Todoist API 오류: %s, %s", response.status_code, Truncated(response.text, LOG_PAYLOAD_LIMIT))
                     return f"Todoist API 요청 중 오류가 발생했습니다. 상태 코드: {response.status_code}"
                 
                 tasks = response.json()
@@ -214,10 +272,10 @@ async def get_todoist_tasks(date_type: str):
             tomorrow_str = tomorrow.strftime("%Y-%m-%d")
             
             if TODOIST_PROJECT_ID:
-                response = requests.get(TODOIST_API_URL, headers=headers)
+                response = requests.get(TODOIST_API_URL, headers=headers, timeout=UPSTREAM_TIMEOUT_SECONDS)
                 
                 if response.status_code != 200:
-                    logger.error(f"Todoist API 오류: {response.status_code}, {response.text}")
+                    logger.error("Todoist API 오류: %s, %s", response.status_code, Truncated(response.text, LOG_PAYLOAD_LIMIT))
                     return f"Todoist API 요청 중 오류가 발생했습니다. 상태 코드: {response.status_code}"
                 
                 all_tasks = response.json()
@@ -238,11 +296,12 @@ async def get_todoist_tasks(date_type: str):
                 response = requests.get(
                     TODOIST_API_URL,
                     headers=headers,
-                    params={"filter": "tomorrow"}
+                    params={"filter": "tomorrow"},
+                    timeout=UPSTREAM_TIMEOUT_SECONDS
                 )
                 
                 if response.status_code != 200:
-                    logger.error(f"Todoist API 오류: {response.status_code}, {response.text}")
+                    logger.error("Todoist API 오류: %s, %s", response.status_code, Truncated(response.text, LOG_PAYLOAD_LIMIT))
                     return f"Todoist API 요청 중 오류가 발생했습니다. 상태 코드: {response.status_code}"
                 
                 tasks = response.json()
@@ -256,10 +315,10 @@ async def get_todoist_tasks(date_type: str):
             end_of_week_str = end_of_week.strftime("%Y-%m-%d")
             
             if TODOIST_PROJECT_ID:
-                response = requests.get(TODOIST_API_URL, headers=headers)
+                response = requests.get(TODOIST_API_URL, headers=headers, timeout=UPSTREAM_TIMEOUT_SECONDS)
                 
                 if response.status_code != 200:
-                    logger.error(f"Todoist API 오류: {response.status_code}, {response.text}")
+                    logger.error("Todoist API 오류: %s, %s", response.status_code, Truncated(response.text, LOG_PAYLOAD_LIMIT))
                     return f"Todoist API 요청 중 오류가 발생했습니다. 상태 코드: {response.status_code}"
                 
                 all_tasks = response.json()
@@ -281,11 +340,12 @@ async def get_todoist_tasks(date_type: str):
                 response = requests.get(
                     TODOIST_API_URL,
                     headers=headers,
-                    params={"filter": "7 days"}
+                    params={"filter": "7 days"},
+                    timeout=UPSTREAM_TIMEOUT_SECONDS
                 )
                 
                 if response.status_code != 200:
-                    logger.error(f"Todoist API 오류: {response.status_code}, {response.text}")
+                    logger.error("Todoist API 오류: %s, %s", response.status_code, Truncated(response.text, LOG_PAYLOAD_LIMIT))
                     return f"Todoist API 요청 중 오류가 발생했습니다. 상태 코드: {response.status_code}"
                 
                 tasks = response.json()
@@ -300,10 +360,10 @@ async def get_todoist_tasks(date_type: str):
             next_week_end_str = next_week_end.strftime("%Y-%m-%d")
             
             if TODOIST_PROJECT_ID:
-                response = requests.get(TODOIST_API_URL, headers=headers)
+                response = requests.get(TODOIST_API_URL, headers=headers, timeout=UPSTREAM_TIMEOUT_SECONDS)
                 
                 if response.status_code != 200:
-                    logger.error(f"Todoist API 오류: {response.status_code}, {response.text}")
+                    logger.error("Todoist API 오류: %s, %s", response.status_code, Truncated(response.text, LOG_PAYLOAD_LIMIT))
                     return f"Todoist API 요청 중 오류가 발생했습니다. 상태 코드: {response.status_code}"
                 
                 all_tasks = response.json()
@@ -322,10 +382,10 @@ async def get_todoist_tasks(date_type: str):
                 tasks = filtered_tasks
             else:
                 # 직접 API 필터링은 복잡해서 모든 작업을 가져와서 수동으로 필터링
-                response = requests.get(TODOIST_API_URL, headers=headers)
+                response = requests.get(TODOIST_API_URL, headers=headers, timeout=UPSTREAM_TIMEOUT_SECONDS)
                 
                 if response.status_code != 200:
-                    logger.error(f"Todoist API 오류: {response.status_code}, {response.text}")
+                    logger.error("Todoist API 오류: %s, %s", response.status_code, Truncated(response.text, LOG_PAYLOAD_LIMIT))
                     return f"Todoist API 요청 중 오류가 발생했습니다. 상태 코드: {response.status_code}"
                 
                 all_tasks = response.json()
@@ -367,7 +427,7 @@ async def get_todoist_tasks(date_type: str):
         return "\n".join(task_list)
     
     except Exception as e:
-        logger.error(f"Todoist 작업 목록 조회 중 오류 발생: {e}")
+        logger.error("Todoist 작업 목록 조회 중 오류 발생: %s", e)
         return f"Todoist 정보를 가져오는 중 오류가 발생했습니다: {str(e)}"
 
 # 기상청 동네예보 좌표
@@ -392,7 +452,7 @@ WEATHER_DESCRIPTION = {
     "박무": "🌫️ 박무"
 }
 
-async def get_weather_forecast(location: str):
+def get_weather_forecast(location: str):
     try:
         # 기상청 API에 필요한 키가 설정되어 있는지 확인
         if not WEATHER_API_KEY:
@@ -425,7 +485,7 @@ async def get_weather_forecast(location: str):
         else:
             base_time = "1700"  # 밤에는 1700 데이터 사용
         
-        logger.info(f"날씨 정보 요청: {location} (좌표: {coords}, 기준일시: {base_date} {base_time})")
+        logger.info("날씨 정보 요청: %s (좌표: %s, 기준일시: %s %s)", location, coords, base_date, base_time, extra={"sampled": True})
         
         # 기상청 API 호출
         url = f"{WEATHER_API_URL}/getVilageFcst"
@@ -440,17 +500,17 @@ async def get_weather_forecast(location: str):
             'ny': coords['ny']
         }
         
-        response = requests.get(url, params=params)
+        response = requests.get(url, params=params, timeout=UPSTREAM_TIMEOUT_SECONDS)
         
         if response.status_code != 200:
-            logger.error(f"날씨 API 오류: {response.status_code}, {response.text}")
+            logger.error("날씨 API 오류: %s, %s", response.status_code, Truncated(response.text, LOG_PAYLOAD_LIMIT))
             return f"날씨 정보를 가져오는 중 오류가 발생했습니다. 상태 코드: {response.status_code}"
         
         # 응답 데이터 분석
         try:
             data = response.json()
             if 'response' not in data or 'header' not in data['response'] or 'body' not in data['response'] or data['response']['header']['resultCode'] != '00':
-                logger.error(f"날씨 API 응답 구조 오류: {data}")
+                logger.error("날씨 API 응답 구조 오류: %s", Truncated(data, LOG_PAYLOAD_LIMIT))
                 return f"날씨 정보 응답 구조가 예상과 다릅니다."
             
             items = data['response']['body']['items']['item']
@@ -550,13 +610,144 @@ async def get_weather_forecast(location: str):
             return result
             
         except Exception as e:
-            logger.error(f"날씨 데이터 처리 중 오류 발생: {e}")
+            logger.error("날씨 데이터 처리 중 오류 발생: %s", e)
             return f"날씨 정보를 처리하는 중 오류가 발생했습니다: {str(e)}"
             
     except Exception as e:
-        logger.error(f"날씨 정보 요청 중 오류 발생: {e}")
+        logger.error("날씨 정보 요청 중 오류 발생: %s", e)
         return f"날씨 정보를 가져오는 중 오류가 발생했습니다: {str(e)}"
 
+# --- 조회 결과 캐시 ---
+# 각 출처(캘린더, Todoist, 날씨)의 조회 결과를 기간별로 보관합니다.
+# 명령어와 브리핑, 주기적 갱신 작업이 캐시를 채우고, 인라인 버튼/인라인 쿼리는
+# 캐시만 읽어서 응답하므로 외부 API를 호출하지 않습니다.
+VIEW_PERIODS = {
+    # 키: (date_type, 제목, 날씨 포함 여부)
+    "today": ("오늘", "오늘의 정보", True),
+    "tomorrow": ("내일", "내일의 정보", True),
+    "thisweek": ("이번주", "이번 주 정보", False),
+    "nextweek": ("다음주", "다음 주 정보", False),
+}
+
+VIEW_PERIOD_LABELS = {
+    "today": "오늘",
+    "tomorrow": "내일",
+    "thisweek": "이번 주",
+    "nextweek": "다음 주",
+}
+
+# 섹션 표시 여부는 비트마스크로 callback_data에 담음
+SECTION_CALENDAR = 1
+SECTION_TODOIST = 2
+SECTION_WEATHER = 4
+ALL_SECTIONS = SECTION_CALENDAR | SECTION_TODOIST | SECTION_WEATHER
+
+SECTION_LABELS = {
+    SECTION_CALENDAR: "📅 캘린더",
+    SECTION_TODOIST: "📝 Todoist",
+    SECTION_WEATHER: "🌦️ 날씨",
+}
+
+# (출처, date_type) -> (조회 시각, 결과 텍스트). 날씨는 기간과 무관하므로 date_type이 None
+SOURCE_CACHE = {}
+
+async def fetch_off_loop(fetcher, *args):
+    # 조회 함수는 blocking 호출을 하므로 스레드에서 실행
+    # (조회가 느려도 캐시만 읽는 버튼/인라인 응답은 기다리지 않음)
+    # profiled_call은 프로파일링 중일 때 이 스레드의 실행도 측정에 포함시킴
+    return await asyncio.to_thread(profiling.profiled_call, fetcher, *args)
+
+async def fetch_sections(period: str, include_weather: bool = True):
+    # 외부 API에서 새로 조회하고 캐시를 갱신
+    date_type, _, with_weather = VIEW_PERIODS[period]
+    now = time.time()
+    sections = {
+        SECTION_CALENDAR: await fetch_off_loop(get_google_calendar_events, date_type),
+        SECTION_TODOIST: await fetch_off_loop(get_todoist_tasks, date_type),
+    }
+    SOURCE_CACHE[("calendar", date_type)] = (now, sections[SECTION_CALENDAR])
+    SOURCE_CACHE[("todoist", date_type)] = (now, sections[SECTION_TODOIST])
+    if with_weather and include_weather:
+        sections[SECTION_WEATHER] = await fetch_weather_section()
+    return sections
+
+async def fetch_weather_section():
+    # 날씨는 기간과 무관하므로 캐시 항목 하나만 사용
+    now = time.time()
+    text = await fetch_off_loop(get_weather_forecast, DEFAULT_WEATHER_LOCATION)
+    SOURCE_CACHE[("weather", None)] = (now, text)
+    return text
+
+def get_cached_sections(period: str):
+    # 캐시만 사용 (없는 섹션은 결과에서 빠짐), 가장 오래된 조회 시각도 함께 반환
+    date_type, _, with_weather = VIEW_PERIODS[period]
+    keys = {
+        SECTION_CALENDAR: ("calendar", date_type),
+        SECTION_TODOIST: ("todoist", date_type),
+    }
+    if with_weather:
+        keys[SECTION_WEATHER] = ("weather", None)
+    
+    sections = {}
+    oldest = None
+    for section, key in keys.items():
+        cached = SOURCE_CACHE.get(key)
+        if cached:
+            fetched_at, text = cached
+            sections[section] = text
+            oldest = fetched_at if oldest is None else min(oldest, fetched_at)
+    return sections, oldest
+
+def render_view(period: str, sections: dict, mask: int = ALL_SECTIONS, fetched_at=None, title_prefix: str = ""):
+    _, title, with_weather = VIEW_PERIODS[period]
+    parts = []
+    if mask & SECTION_CALENDAR:
+        parts.append(f"📅 구글 캘린더\n{sections.get(SECTION_CALENDAR, '아직 불러온 정보가 없습니다.')}")
+    if mask & SECTION_TODOIST:
+        parts.append(f"📝 Todoist\n{sections.get(SECTION_TODOIST, '아직 불러온 정보가 없습니다.')}")
+    if with_weather and mask & SECTION_WEATHER:
+        parts.append(f"🌦️ 날씨 ({DEFAULT_WEATHER_LOCATION})\n{sections.get(SECTION_WEATHER, '아직 불러온 정보가 없습니다.')}")
+    if not parts:
+        parts.append("표시할 항목을 아래 버튼에서 선택하세요.")
+    
+    text = f"{title_prefix}{title}\n\n" + "\n\n".join(parts)
+    if fetched_at is not None:
+        updated = datetime.datetime.fromtimestamp(fetched_at, pytz.timezone('Asia/Seoul'))
+        text += f"\n\n({updated.strftime('%H:%M')} 기준)"
+    return text
+
+def build_view_keyboard(period: str, mask: int):
+    period_row = [
+        InlineKeyboardButton(
+            f"[{label}]" if key == period else label,
+            callback_data=f"view:{key}:{mask}"
+        )
+        for key, label in VIEW_PERIOD_LABELS.items()
+    ]
+    
+    with_weather = VIEW_PERIODS[period][2]
+    section_row = []
+    for section, label in SECTION_LABELS.items():
+        if section == SECTION_WEATHER and not with_weather:
+            continue
+        mark = "✅" if mask & section else "⬜"
+        section_row.append(
+            InlineKeyboardButton(f"{mark} {label}", callback_data=f"view:{period}:{mask ^ section}")
+        )
+    return InlineKeyboardMarkup([period_row, section_row])
+
+async def refresh_cache_job(context: ContextTypes.DEFAULT_TYPE):
+    # 인라인 조회가 항상 최근 데이터를 보여주도록 주기적으로 캐시를 채움 (날씨는 한 번만 조회)
+    for period in VIEW_PERIODS:
+        try:
+            await fetch_sections(period, include_weather=False)
+        except Exception as e:
+            logger.error("캐시 갱신 중 오류 발생 (%s): %s", period, e)
+    try:
+        await fetch_weather_section()
+    except Exception as e:
+        logger.error("캐시 갱신 중 오류 발생 (날씨): %s", e)
+
 # --- 명령어 핸들러 함수들 ---
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE): # FR5.1
     user_name = update.effective_user.first_name
@@ -575,112 +766,351 @@ jpgn_21_bot 사용법 안내
 /tomorrow - 내일 일정, 할 일, 날씨
 /thisweek - 이번 주 일정 및 할 일
 /nextweek - 다음 주 일정 및 할 일
+조회 결과 아래 버튼으로 기간과 항목을 바로 바꿔 볼 수 있습니다.
+다른 대화방에서는 @봇이름 오늘 처럼 인라인으로도 조회할 수 있습니다.
+
+자동 브리핑 설정
+/set_morning_briefing_time HH:MM - 아침 브리핑 시간 설정
+/set_evening_briefing_time HH:MM - 저녁 브리핑 시간 설정
 
-매일 아침 08:00와 저녁 20:00에 자동으로 일정 브리핑이 제공됩니다.
+매일 아침과 저녁(기본 {morning} / {evening})에 자동으로 일정 브리핑이 제공됩니다.
 
 문의사항은 관리자에게 연락해주세요.
-"""
+""".format(morning=DEFAULT_MORNING_BRIEFING_TIME, evening=DEFAULT_EVENING_BRIEFING_TIME)
     await update.message.reply_text(help_text)
 
-async def today_command(update: Update, context: ContextTypes.DEFAULT_TYPE): # FR5.8
+async def send_view(update: Update, period: str):
     try:
-        calendar_info = await get_google_calendar_events("오늘")
-        todoist_info = await get_todoist_tasks("오늘")
-        weather_info = await get_weather_forecast(DEFAULT_WEATHER_LOCATION)
-        
-        response_text = f"오늘의 정보\n\n"
-        response_text += f"📅 구글 캘린더\n{calendar_info}\n\n"
-        response_text += f"📝 Todoist\n{todoist_info}\n\n"
-        response_text += f"🌦️ 날씨 ({DEFAULT_WEATHER_LOCATION})\n{weather_info}"
-        
-        await update.message.reply_text(response_text)
+        sections = await fetch_sections(period)
+        await update.message.reply_text(
+            render_view(period, sections),
+            reply_markup=build_view_keyboard(period, ALL_SECTIONS)
+        )
     except Exception as e:
-        logger.error(f"오늘 명령어 처리 중 오류: {e}")
+        logger.error("%s 명령어 처리 중 오류: %s", VIEW_PERIODS[period][0], e)
         await update.message.reply_text(f"정보를 가져오는 중 오류가 발생했습니다: {str(e)}")
 
+async def today_command(update: Update, context: ContextTypes.DEFAULT_TYPE): # FR5.8
+    await send_view(update, "today")
+
 async def tomorrow_command(update: Update, context: ContextTypes.DEFAULT_TYPE): # FR5.9
-    try:
-        calendar_info = await get_google_calendar_events("내일")
-        todoist_info = await get_todoist_tasks("내일")
-        # 내일 날씨는 보통 오늘의 날씨 정보에서 함께 제공되거나 별도 요청 필요
-        weather_info = await get_weather_forecast(DEFAULT_WEATHER_LOCATION) # 일단 오늘 날씨로 대체, 추후 수정
-        
-        response_text = f"내일의 정보\n\n"
-        response_text += f"📅 구글 캘린더\n{calendar_info}\n\n"
-        response_text += f"📝 Todoist\n{todoist_info}\n\n"
-        response_text += f"🌦️ 날씨 ({DEFAULT_WEATHER_LOCATION})\n{weather_info}" # 내일 날씨로 수정 필요
-        
-        await update.message.reply_text(response_text)
-    except Exception as e:
-        logger.error(f"내일 명령어 처리 중 오류: {e}")
-        await update.message.reply_text(f"정보를 가져오는 중 오류가 발생했습니다: {str(e)}")
+    await send_view(update, "tomorrow")
 
 async def this_week_command(update: Update, context: ContextTypes.DEFAULT_TYPE): # FR5.10
-    try:
-        calendar_info = await get_google_calendar_events("이번주")
-        todoist_info = await get_todoist_tasks("이번주")
-        
-        response_text = f"이번 주 정보\n\n"
-        response_text += f"📅 구글 캘린더\n{calendar_info}\n\n"
-        response_text += f"📝 Todoist\n{todoist_info}"
-        
-        await update.message.reply_text(response_text)
-    except Exception as e:
-        logger.error(f"이번주 명령어 처리 중 오류: {e}")
-        await update.message.reply_text(f"정보를 가져오는 중 오류가 발생했습니다: {str(e)}")
+    await send_view(update, "thisweek")
 
 async def next_week_command(update: Update, context: ContextTypes.DEFAULT_TYPE): # FR5.11
+    await send_view(update, "nextweek")
+
+# --- 인라인 버튼 / 인라인 쿼리 (캐시만 사용) ---
+async def view_callback(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = update.callback_query
     try:
-        calendar_info = await get_google_calendar_events("다음주")
-        todoist_info = await get_todoist_tasks("다음주")
-        
-        response_text = f"다음 주 정보\n\n"
-        response_text += f"📅 구글 캘린더\n{calendar_info}\n\n"
-        response_text += f"📝 Todoist\n{todoist_info}"
-        
-        await update.message.reply_text(response_text)
-    except Exception as e:
-        logger.error(f"다음주 명령어 처리 중 오류: {e}")
-        await update.message.reply_text(f"정보를 가져오는 중 오류가 발생했습니다: {str(e)}")
+        _, period, mask_str = query.data.split(":")
+        mask = int(mask_str)
+        if period not in VIEW_PERIODS:
+            raise ValueError(period)
+    except ValueError:
+        await query.answer("알 수 없는 요청입니다.")
+        return
+    
+    sections, fetched_at = get_cached_sections(period)
+    await query.answer()
+    try:
+        await query.edit_message_text(
+            render_view(period, sections, mask, fetched_at),
+            reply_markup=build_view_keyboard(period, mask)
+        )
+    except BadRequest as e:
+        # 같은 버튼을 다시 누르면 내용이 바뀌지 않아 오류가 나므로 무시
+        if "not modified" not in str(e).lower():
+            raise
+
+async def inline_query(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # 예: "@jpgn_21_bot 오늘" / "@jpgn_21_bot 이번" (빈 쿼리면 모든 기간 표시)
+    query_text = update.inline_query.query.strip()
+    results = []
+    for period, label in VIEW_PERIOD_LABELS.items():
+        if query_text and query_text not in label and query_text not in label.replace(" ", "") and query_text not in period:
+            continue
+        sections, fetched_at = get_cached_sections(period)
+        results.append(
+            InlineQueryResultArticle(
+                id=period,
+                title=VIEW_PERIODS[period][1],
+                description="일정, 할 일" + (", 날씨" if VIEW_PERIODS[period][2] else ""),
+                input_message_content=InputTextMessageContent(render_view(period, sections, fetched_at=fetched_at))
+            )
+        )
+    await update.inline_query.answer(results, cache_time=60)
 
 # --- 자동 알림 함수 (FR4) ---
-async def morning_briefing(context: ContextTypes.DEFAULT_TYPE):
-    job = context.job
+async def build_morning_briefing():
+    # 오늘의 정보 요약 생성 (조회 결과는 인라인 조회용 캐시에도 저장됨)
+    sections = await fetch_sections("today")
+    return render_view("today", sections, title_prefix="[아침 브리핑] ")
+
+async def build_evening_briefing():
+    # 내일의 정보 요약 생성
+    sections = await fetch_sections("tomorrow")
+    return render_view("tomorrow", sections, title_prefix="[저녁 브리핑] ")
+
+BRIEFING_BUILDERS = {
+    "morning": build_morning_briefing,
+    "evening": build_evening_briefing,
+}
+
+BRIEFING_NAMES = {
+    "morning": "아침",
+    "evening": "저녁",
+}
+
+async def send_briefing(bot, kind: str, chat_ids, still_leader=None):
+    # 같은 시각의 채팅방들은 내용이 같으므로 한 번만 생성해서 모두에게 전송
+    # still_leader가 주어지면 채팅방마다 전송 직전에 리더인지 확인하고, 아니면 중단 후 False 반환
     try:
-        # 오늘의 정보 요약 생성
-        calendar_info = await get_google_calendar_events("오늘")
-        todoist_info = await get_todoist_tasks("오늘")
-        weather_info = await get_weather_forecast(DEFAULT_WEATHER_LOCATION)
-        
-        briefing_text = f"[아침 브리핑] 오늘의 정보\n\n"
-        briefing_text += f"📅 구글 캘린더\n{calendar_info}\n\n"
-        briefing_text += f"📝 Todoist\n{todoist_info}\n\n"
-        briefing_text += f"🌦️ 날씨 ({DEFAULT_WEATHER_LOCATION})\n{weather_info}"
-        
-        # 저장된 채팅 ID로 메시지 전송
-        await context.bot.send_message(chat_id=job.chat_id, text=briefing_text)
-        logger.info(f"아침 브리핑 전송 완료 (Chat ID: {job.chat_id})")
+        briefing_text = await BRIEFING_BUILDERS[kind]()
     except Exception as e:
-        logger.error(f"아침 브리핑 생성 중 오류 발생: {e}")
+        logger.error("%s 브리핑 생성 중 오류 발생: %s", BRIEFING_NAMES[kind], e)
+        return True
+    
+    for chat_id in chat_ids:
+        if still_leader is not None and not await still_leader():
+            logger.warning("리더 임대를 잃어 %s 브리핑 전송을 중단합니다. (Worker: %s)", BRIEFING_NAMES[kind], WORKER_ID)
+            return False
+        try:
+            await bot.send_message(chat_id=chat_id, text=briefing_text)
+            logger.info("%s 브리핑 전송 완료 (Chat ID: %s)", BRIEFING_NAMES[kind], chat_id, extra={"sampled": True})
+        except Exception as e:
+            logger.error("%s 브리핑 전송 중 오류 발생 (Chat ID: %s): %s", BRIEFING_NAMES[kind], chat_id, e)
+    return True
 
-async def evening_briefing(context: ContextTypes.DEFAULT_TYPE):
-    job = context.job
-    try:
-        # 내일의 정보 요약 생성
-        calendar_info = await get_google_calendar_events("내일")
-        todoist_info = await get_todoist_tasks("내일")
-        weather_info = await get_weather_forecast(DEFAULT_WEATHER_LOCATION)
-        
-        briefing_text = f"[저녁 브리핑] 내일의 정보\n\n"
-        briefing_text += f"📅 구글 캘린더\n{calendar_info}\n\n"
-        briefing_text += f"📝 Todoist\n{todoist_info}\n\n"
-        briefing_text += f"🌦️ 날씨 ({DEFAULT_WEATHER_LOCATION})\n{weather_info}"
+# --- 브리핑 시간 저장소 ---
+# 채팅방별 브리핑 시간은 자정 기준 분(0~1439) 정수 하나로 SQLite에 저장합니다.
+# morning/evening 컬럼에 인덱스를 두어 "지금 이 분에 보낼 채팅방"만 바로 조회하므로
+# 채팅방이 늘어나도 스케줄러 작업은 1개, 깨어나는 횟수는 1분에 1번으로 일정합니다.
+_db_local = threading.local()
+
+def get_db():
+    # sqlite3 연결은 만든 스레드에서만 쓸 수 있으므로 스레드마다 따로 연결 (임대 갱신은 스레드에서 실행됨)
+    conn = getattr(_db_local, "conn", None)
+    if conn is None:
+        conn = _db_local.conn = sqlite3.connect(BOT_DB_PATH, timeout=10)
+    return conn
+
+def init_db():
+    conn = get_db()
+    # 여러 워커 프로세스가 같은 파일을 동시에 읽고 쓸 수 있도록 WAL 모드 사용
+    conn.execute("PRAGMA journal_mode=WAL")
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS briefing_times ("
+            "chat_id INTEGER PRIMARY KEY, "
+            "morning INTEGER NOT NULL, "
+            "evening INTEGER NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_briefing_morning ON briefing_times (morning)")
+        conn.execute("CREATE INDEX IF NOT EXISTS idx_briefing_evening ON briefing_times (evening)")
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS leader_lease ("
+            "name TEXT PRIMARY KEY, "
+            "holder TEXT NOT NULL, "
+            "expires_at REAL NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS scheduler_state ("
+            "name TEXT PRIMARY KEY, "
+            "value INTEGER NOT NULL)"
+        )
+
+BRIEFING_TIME_PATTERN = re.compile(r"([0-9]{1,2}):([0-9]{2})")
+
+def parse_briefing_time(text: str):
+    # "HH:MM" 형식을 자정 기준 분으로 변환 (형식이 틀리면 None)
+    match = BRIEFING_TIME_PATTERN.fullmatch(text.strip())
+    if not match:
+        return None
+    hour, minute = int(match.group(1)), int(match.group(2))
+    if not (0 <= hour < 24 and 0 <= minute < 60):
+        return None
+    return hour * 60 + minute
+
+def format_briefing_time(minute_of_day: int) -> str:
+    return f"{minute_of_day // 60:02d}:{minute_of_day % 60:02d}"
+
+DEFAULT_BRIEFING_MINUTES = {
+    "morning": parse_briefing_time(DEFAULT_MORNING_BRIEFING_TIME),
+    "evening": parse_briefing_time(DEFAULT_EVENING_BRIEFING_TIME),
+}
+
+# 기본 브리핑 시간 환경 변수가 잘못되면 채팅방 등록이 실패하므로 시작 시점에 확인
+if None in DEFAULT_BRIEFING_MINUTES.values():
+    logger.error(
+        "기본 브리핑 시간 형식이 올바르지 않습니다! (DEFAULT_MORNING_BRIEFING_TIME=%s, DEFAULT_EVENING_BRIEFING_TIME=%s, 예: 08:00)",
+        DEFAULT_MORNING_BRIEFING_TIME, DEFAULT_EVENING_BRIEFING_TIME
+    )
+    exit()
+
+def register_briefing_chat(chat_id: int):
+    # 이미 등록된 채팅방은 설정된 시간을 유지
+    conn = get_db()
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO briefing_times (chat_id, morning, evening) VALUES (?, ?, ?)",
+            (chat_id, DEFAULT_BRIEFING_MINUTES["morning"], DEFAULT_BRIEFING_MINUTES["evening"])
+        )
+
+def set_briefing_time(chat_id: int, kind: str, minute_of_day: int):
+    values = dict(DEFAULT_BRIEFING_MINUTES)
+    values[kind] = minute_of_day
+    conn = get_db()
+    with conn:
+        conn.execute(
+            "INSERT INTO briefing_times (chat_id, morning, evening) VALUES (?, ?, ?) "
+            f"ON CONFLICT(chat_id) DO UPDATE SET {kind} = excluded.{kind}",
+            (chat_id, values["morning"], values["evening"])
+        )
+
+def get_briefing_times(chat_id: int):
+    row = get_db().execute(
+        "SELECT morning, evening FROM briefing_times WHERE chat_id = ?", (chat_id,)
+    ).fetchone()
+    if row is None:
+        return dict(DEFAULT_BRIEFING_MINUTES)
+    return {"morning": row[0], "evening": row[1]}
+
+def get_chats_for_slot(kind: str, minute_of_day: int):
+    rows = get_db().execute(
+        f"SELECT chat_id FROM briefing_times WHERE {kind} = ?", (minute_of_day,)
+    ).fetchall()
+    return [row[0] for row in rows]
+
+# --- 리더 선출 ---
+# 같은 SQLite 파일을 공유하는 워커들 중 임대(lease)를 가진 하나만 브리핑을 전송합니다.
+# 리더가 죽으면 임대가 만료된 뒤 다른 워커가 다음 틱에서 이어받습니다.
+_lease_expires_at = 0.0  # 이 워커가 가진 임대의 만료 시각 (로컬 기록)
+
+def try_acquire_leadership(name: str = "briefing") -> bool:
+    global _lease_expires_at
+    now = time.time()
+    conn = get_db()
+    with conn:
+        # 비어 있거나, 내가 가지고 있거나, 만료된 임대만 갱신 (단일 문장이라 원자적)
+        conn.execute(
+            "INSERT INTO leader_lease (name, holder, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET holder = excluded.holder, expires_at = excluded.expires_at "
+            "WHERE leader_lease.holder = excluded.holder OR leader_lease.expires_at < ?",
+            (name, WORKER_ID, now + LEADER_LEASE_SECONDS, now)
+        )
+    row = conn.execute("SELECT holder FROM leader_lease WHERE name = ?", (name,)).fetchone()
+    is_leader = row is not None and row[0] == WORKER_ID
+    _lease_expires_at = now + LEADER_LEASE_SECONDS if is_leader else 0.0
+    return is_leader
+
+async def ensure_leadership() -> bool:
+    # 임대가 절반 이상 남아 있으면 DB에 쓰지 않고 로컬 기록만으로 판단
+    # 갱신이 필요할 때만 SQLite 쓰기(락 대기 포함)를 스레드에서 실행하여 이벤트 루프를 막지 않음
+    if _lease_expires_at - time.time() > LEADER_LEASE_SECONDS / 2:
+        return True
+    return await asyncio.to_thread(try_acquire_leadership)
+
+def release_leadership(name: str = "briefing"):
+    global _lease_expires_at
+    _lease_expires_at = 0.0
+    conn = get_db()
+    with conn:
+        conn.execute("DELETE FROM leader_lease WHERE name = ? AND holder = ?", (name, WORKER_ID))
+
+def get_scheduler_state(name: str):
+    row = get_db().execute("SELECT value FROM scheduler_state WHERE name = ?", (name,)).fetchone()
+    return row[0] if row else None
+
+def claim_scheduler_minute(name: str, minute: int) -> bool:
+    # 저장된 값이 minute보다 작을 때만 minute으로 올림 (compare-and-set)
+    # 이미 다른 워커가 이 분을 가져갔으면 False
+    conn = get_db()
+    with conn:
+        conn.execute(
+            "INSERT OR IGNORE INTO scheduler_state (name, value) VALUES (?, ?)",
+            (name, minute - 1)
+        )
+        cursor = conn.execute(
+            "UPDATE scheduler_state SET value = ? WHERE name = ? AND value < ?",
+            (minute, name, minute)
+        )
+    return cursor.rowcount == 1
+
+# --- 브리핑 스케줄러 ---
+async def briefing_tick(context: ContextTypes.DEFAULT_TYPE):
+    # 1분마다 한 번 실행되어 이번 분에 해당하는 채팅방에만 브리핑을 전송
+    is_leader = await ensure_leadership()
+    if is_leader != context.bot_data.get("is_leader", False):
+        logger.info("브리핑 리더 상태 변경: %s (Worker: %s)", "리더" if is_leader else "대기", WORKER_ID)
+        context.bot_data["is_leader"] = is_leader
+    if not is_leader:
+        return
+    
+    korea_tz = pytz.timezone('Asia/Seoul')
+    now_minute = int(time.time() // 60)
+    # 마지막 처리 시각은 DB에 저장하여 리더가 바뀌어도 중복/누락 없이 이어서 처리
+    last_minute = get_scheduler_state("last_briefing_minute")
+    if last_minute is None:
+        last_minute = now_minute - 1
+    
+    # 틱이 지연되어 놓친 분이 있으면 보충 (너무 오래된 분은 건너뜀)
+    first_minute = max(last_minute + 1, now_minute - BRIEFING_CATCHUP_MINUTES + 1)
+    for abs_minute in range(first_minute, now_minute + 1):
+        # 앞선 분의 전송이 길어져 임대를 잃었으면 남은 분은 새 리더에게 맡김
+        if not await ensure_leadership():
+            logger.warning("리더 임대를 잃어 브리핑 처리를 중단합니다. (Worker: %s)", WORKER_ID)
+            context.bot_data["is_leader"] = False
+            return
+        # 전송 전에 이 분을 먼저 처리한 것으로 기록하여 새 리더가 같은 분을 다시 보내지 않도록 함
+        # (전송 도중 중단되면 남은 채팅방은 건너뛰며, 중복 전송보다 누락을 택함)
+        if not await asyncio.to_thread(claim_scheduler_minute, "last_briefing_minute", abs_minute):
+            continue
         
-        # 저장된 채팅 ID로 메시지 전송
-        await context.bot.send_message(chat_id=job.chat_id, text=briefing_text)
-        logger.info(f"저녁 브리핑 전송 완료 (Chat ID: {job.chat_id})")
-    except Exception as e:
-        logger.error(f"저녁 브리핑 생성 중 오류 발생: {e}")
+        slot_time = datetime.datetime.fromtimestamp(abs_minute * 60, korea_tz)
+        slot = slot_time.hour * 60 + slot_time.minute
+        for kind in BRIEFING_BUILDERS:
+            chat_ids = get_chats_for_slot(kind, slot)
+            if chat_ids and not await send_briefing(context.bot, kind, chat_ids, still_leader=ensure_leadership):
+                context.bot_data["is_leader"] = False
+                return
+
+def schedule_briefing_tick(job_queue):
+    # 매 분 정각 직후에 실행되도록 첫 실행 시점을 맞춤
+    first = 60 - (time.time() % 60) + 1
+    job_queue.run_repeating(briefing_tick, interval=60, first=first, name="briefing_tick")
+    logger.info("브리핑 스케줄러 시작 (1분 간격)")
+
+# --- 브리핑 시간 설정 명령어 (FR5.6, FR5.7) ---
+async def set_briefing_time_command(update: Update, context: ContextTypes.DEFAULT_TYPE, kind: str):
+    chat_id = update.effective_chat.id
+    name = BRIEFING_NAMES[kind]
+    
+    if not context.args:
+        current = get_briefing_times(chat_id)[kind]
+        await update.message.reply_text(
+            f"현재 {name} 브리핑 시간: {format_briefing_time(current)}\n"
+            f"사용법: /set_{kind}_briefing_time HH:MM"
+        )
+        return
+    
+    minute_of_day = parse_briefing_time(context.args[0])
+    if minute_of_day is None:
+        await update.message.reply_text(f"시간 형식이 올바르지 않습니다. 예: /set_{kind}_briefing_time 08:00")
+        return
+    
+    set_briefing_time(chat_id, kind, minute_of_day)
+    logger.info("%s 브리핑 시간 변경됨 (%s, Chat ID: %s)", name, format_briefing_time(minute_of_day), chat_id)
+    await update.message.reply_text(f"{name} 브리핑 시간이 {format_briefing_time(minute_of_day)}(으)로 설정되었습니다.")
+
+async def set_morning_briefing_time_command(update: Update, context: ContextTypes.DEFAULT_TYPE): # FR5.6
+    await set_briefing_time_command(update, context, "morning")
+
+async def set_evening_briefing_time_command(update: Update, context: ContextTypes.DEFAULT_TYPE): # FR5.7
+    await set_briefing_time_command(update, context, "evening")
 
 # 새로운 채팅방에 추가될 때 자동으로 채팅 ID 저장
 async def new_chat_members(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -689,55 +1119,90 @@ async def new_chat_members(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     for member in update.message.new_chat_members:
         if member.id == bot.id:
-            logger.info(f"봇이 새 채팅방에 추가됨: {chat_id}")
+            logger.info("봇이 새 채팅방에 추가됨: %s", chat_id)
             
-            # 이 채팅방에 아침, 저녁 브리핑 일정 추가
-            add_briefing_schedule(context.job_queue, chat_id)
+            # 이 채팅방을 기본 시간의 아침, 저녁 브리핑 대상으로 등록
+            register_briefing_chat(chat_id)
             
             await update.message.reply_text(
                 "안녕하세요! jpgn_21_bot입니다.\n"
                 "팀의 일정과 할 일을 관리하고 날씨 정보를 알려드립니다.\n"
-                "매일 아침 08:00와 저녁 20:00에 자동으로 브리핑이 제공됩니다.\n"
+                f"매일 아침 {DEFAULT_MORNING_BRIEFING_TIME}와 저녁 {DEFAULT_EVENING_BRIEFING_TIME}에 자동으로 브리핑이 제공됩니다.\n"
                 "사용 가능한 명령어는 /help 를 입력하여 확인하세요."
             )
 
-# 브리핑 스케줄 설정 함수
-def add_briefing_schedule(job_queue, chat_id):
-    # 기존 일정이 있으면 제거
-    current_jobs = job_queue.get_jobs_by_name(f"morning_briefing_{chat_id}")
-    for job in current_jobs:
-        job.schedule_removal()
-    
-    current_jobs = job_queue.get_jobs_by_name(f"evening_briefing_{chat_id}")
-    for job in current_jobs:
-        job.schedule_removal()
+# --- 프로파일링 ---
+def start_profiling_window(job_queue, mode: str, seconds: int, chat_id=None):
+    # 핸들러와 작업이 실행되는 이벤트 루프 스레드에서 측정을 시작하고 일정 시간 뒤 종료
+    profiling.start_profiling(
+        mode,
+        PROFILE_DIR,
+        label=WORKER_ID.replace(":", "-"),
+        interval=PROFILE_SAMPLE_INTERVAL
+    )
+    job_queue.run_once(profile_window_done, when=seconds, chat_id=chat_id, name="profile_window")
+    logger.info("프로파일링 시작 (모드: %s, %s초, Worker: %s)", mode, seconds, WORKER_ID)
+
+def finish_profiling():
+    paths = profiling.stop_profiling()
+    if paths:
+        logger.info("프로파일링 결과 저장: %s", ", ".join(paths))
+    return paths
+
+async def profile_window_done(context: ContextTypes.DEFAULT_TYPE):
+    paths = finish_profiling()
+    if paths and context.job.chat_id:
+        await context.bot.send_message(
+            chat_id=context.job.chat_id,
+            text="프로파일링이 끝났습니다. 결과 파일:\n" + "\n".join(paths)
+        )
+
+async def profile_command(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # 사용법: /profile [초] [cpu|alloc|all]  또는  /profile stop
+    if update.effective_user.id not in ADMIN_USER_IDS:
+        await update.message.reply_text("관리자만 사용할 수 있는 명령어입니다.")
+        return
     
-    # 한국 시간대 설정
-    korea_tz = pytz.timezone('Asia/Seoul')
+    args = context.args or []
+    if args and args[0] == "stop":
+        for job in context.job_queue.get_jobs_by_name("profile_window"):
+            job.schedule_removal()
+        paths = finish_profiling()
+        if paths is None:
+            await update.message.reply_text("진행 중인 프로파일링이 없습니다.")
+        else:
+            await update.message.reply_text("프로파일링을 중단했습니다. 결과 파일:\n" + "\n".join(paths))
+        return
     
-    # 아침 브리핑 (08:00)
-    morning_time = datetime.time(hour=8, minute=0, tzinfo=korea_tz)
-    job_queue.run_daily(
-        morning_briefing, 
-        time=morning_time, 
-        chat_id=chat_id,
-        name=f"morning_briefing_{chat_id}"
-    )
-    logger.info(f"아침 브리핑 일정 추가됨 (08:00, Chat ID: {chat_id})")
+    try:
+        seconds = int(args[0]) if args else PROFILE_SECONDS
+    except ValueError:
+        seconds = 0
+    mode = args[1] if len(args) > 1 else "cpu"
+    if seconds <= 0 or mode not in profiling.PROFILE_MODES:
+        await update.message.reply_text("사용법: /profile [초] [cpu|alloc|all] 또는 /profile stop")
+        return
     
-    # 저녁 브리핑 (20:00)
-    evening_time = datetime.time(hour=20, minute=0, tzinfo=korea_tz)
-    job_queue.run_daily(
-        evening_briefing, 
-        time=evening_time, 
-        chat_id=chat_id,
-        name=f"evening_briefing_{chat_id}"
-    )
-    logger.info(f"저녁 브리핑 일정 추가됨 (20:00, Chat ID: {chat_id})")
+    try:
+        start_profiling_window(context.job_queue, mode, seconds, chat_id=update.effective_chat.id)
+    except RuntimeError as e:
+        await update.message.reply_text(str(e))
+        return
+    await update.message.reply_text(f"프로파일링을 시작합니다. (모드: {mode}, {seconds}초, Worker: {WORKER_ID})")
+
+async def on_startup(application):
+    if PROFILE_MODE:
+        start_profiling_window(application.job_queue, PROFILE_MODE, PROFILE_SECONDS)
+
+async def on_shutdown(application):
+    # 종료 시 임대를 반납하여 다른 워커가 바로 리더를 이어받도록 함
+    release_leadership()
+    finish_profiling()
+    logger.info("워커 종료 (Worker: %s)", WORKER_ID)
 
 def main() -> None:
     """봇을 시작합니다."""
-    application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).build()
+    application = ApplicationBuilder().token(TELEGRAM_BOT_TOKEN).post_init(on_startup).post_shutdown(on_shutdown).build()
 
     # 명령어 핸들러 등록
     application.add_handler(CommandHandler("start", start))
@@ -746,25 +1211,52 @@ def main() -> None:
     application.add_handler(CommandHandler("tomorrow", tomorrow_command))
     application.add_handler(CommandHandler("thisweek", this_week_command))
     application.add_handler(CommandHandler("nextweek", next_week_command))
+    application.add_handler(CommandHandler("set_morning_briefing_time", set_morning_briefing_time_command))
+    application.add_handler(CommandHandler("set_evening_briefing_time", set_evening_briefing_time_command))
+    application.add_handler(CommandHandler("profile", profile_command))
+    
+    # 인라인 버튼과 인라인 쿼리 핸들러 (캐시된 정보만 사용)
+    application.add_handler(CallbackQueryHandler(view_callback, pattern="^view:"))
+    application.add_handler(InlineQueryHandler(inline_query))
     
     # 새 채팅방에 추가될 때 이벤트 핸들러
     application.add_handler(MessageHandler(filters.StatusUpdate.NEW_CHAT_MEMBERS, new_chat_members))
 
-    # 이미 작동 중인 채팅방에 대한 브리핑 설정
-    # 실제 운영 시에는 DB에서 저장된 채팅 ID 목록을 불러와야 함
-    # 여기서는 예시로 특정 채팅 ID 사용
+    # 브리핑 대상 채팅방은 DB에 저장되며, 환경 변수의 채팅 ID는 기본 시간으로 추가 등록
+    init_db()
     chat_ids = []
     if 'TELEGRAM_CHAT_IDS' in os.environ:
         chat_ids_str = os.environ.get('TELEGRAM_CHAT_IDS', '')
         if chat_ids_str:
             chat_ids = [int(chat_id.strip()) for chat_id in chat_ids_str.split(',') if chat_id.strip()]
     
-    job_queue = application.job_queue
     for chat_id in chat_ids:
-        add_briefing_schedule(job_queue, chat_id)
+        register_briefing_chat(chat_id)
+    
+    schedule_briefing_tick(application.job_queue)
+    # 각 워커는 자신의 캐시를 따로 가지므로 리더 여부와 관계없이 갱신
+    application.job_queue.run_repeating(refresh_cache_job, interval=CACHE_REFRESH_SECONDS, first=5, name="refresh_cache")
 
-    logger.info("봇 시작 중...")
-    application.run_polling()
+    if BOT_MODE == "webhook":
+        if not WEBHOOK_URL:
+            logger.error("웹훅 모드에는 WEBHOOK_URL 환경 변수가 필요합니다.")
+            exit()
+        # 비밀 토큰이 없으면 웹훅 URL로 누구나 가짜 업데이트를 보낼 수 있어 관리자 확인 등이 무력화됨
+        if not WEBHOOK_SECRET_TOKEN:
+            logger.error("웹훅 모드에는 WEBHOOK_SECRET_TOKEN 환경 변수가 필요합니다.")
+            exit()
+        # 모든 워커가 같은 URL을 등록하며, 로드밸런서가 요청을 워커들에 분배
+        logger.info("봇 시작 중... (웹훅 모드, Worker: %s, 포트: %s)", WORKER_ID, WEBHOOK_PORT)
+        application.run_webhook(
+            listen=WEBHOOK_LISTEN,
+            port=WEBHOOK_PORT,
+            url_path=WEBHOOK_PATH,
+            webhook_url=f"{WEBHOOK_URL.rstrip('/')}/{WEBHOOK_PATH}",
+            secret_token=WEBHOOK_SECRET_TOKEN,
+        )
+    else:
+        logger.info("봇 시작 중...")
+        application.run_polling()
 
 if __name__ == '__main__':
     main() 
\ No newline at end of file
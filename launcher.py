@@ -0,0 +1,165 @@
+"""웹훅 모드 봇 워커를 여러 개 띄우고, 텔레그램 웹훅 요청을 워커들에게 나눠 전달하는 앞단 프로세스입니다.
+
+Procfile의 web: 항목으로 실행합니다. $PORT에서 웹훅 요청을 받아 채팅방 ID 기준으로 워커를 골라 넘기므로
+같은 채팅방의 업데이트는 항상 같은 워커가 순서대로 처리합니다. 워커는 같은 호스트(같은 dyno)에서 실행되므로
+BOT_DB_PATH의 SQLite 파일을 공유하고, 그중 리더 하나만 브리핑을 전송합니다.
+
+환경 변수:
+    PORT                  외부에서 웹훅 요청을 받을 포트 (기본값 8443)
+    BOT_WORKERS           띄울 워커 수 (없으면 WEB_CONCURRENCY, 기본값 2)
+    BOT_WORKER_BASE_PORT  워커 i는 127.0.0.1:(BOT_WORKER_BASE_PORT + i)에서 대기 (기본값 PORT + 1)
+    WEBHOOK_PATH          bot.py와 같은 값 (기본값 telegram)
+    그 밖의 설정(WEBHOOK_URL, WEBHOOK_SECRET_TOKEN 등)은 워커에게 그대로 전달됩니다.
+"""
+import http.server
+import json
+import logging
+import os
+import signal
+import subprocess
+import sys
+import threading
+import urllib.error
+import urllib.request
+
+from log_utils import setup_logging
+
+PORT = int(os.environ.get("PORT", "8443"))
+WORKER_COUNT = int(os.environ.get("BOT_WORKERS", os.environ.get("WEB_CONCURRENCY", "2")))
+WORKER_BASE_PORT = int(os.environ.get("BOT_WORKER_BASE_PORT", str(PORT + 1)))
+WEBHOOK_PATH = os.environ.get("WEBHOOK_PATH", "telegram")
+FORWARD_TIMEOUT_SECONDS = 30  # 워커 응답 대기 시간 (넘으면 503을 돌려 텔레그램이 다시 보내게 함)
+RESTART_CHECK_SECONDS = 5  # 종료된 워커를 확인하고 다시 띄우는 주기
+
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+setup_logging(level=os.environ.get("LOG_LEVEL", "INFO"), use_queue=False)
+logger = logging.getLogger("launcher")
+
+
+class Worker:
+    """127.0.0.1의 고정 포트에서 웹훅을 받는 bot.py 자식 프로세스 하나를 관리합니다."""
+
+    def __init__(self, index: int):
+        self.index = index
+        self.port = WORKER_BASE_PORT + index
+        self.process = None
+
+    def start(self):
+        env = dict(os.environ, BOT_MODE="webhook", WEBHOOK_LISTEN="127.0.0.1", PORT=str(self.port))
+        script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bot.py")
+        self.process = subprocess.Popen([sys.executable, script], env=env)
+        logger.info("워커 %d 시작 (PID: %d, 포트: %d)", self.index, self.process.pid, self.port)
+
+    def restart_if_exited(self):
+        code = self.process.poll()
+        if code is not None:
+            logger.warning("워커 %d 프로세스가 종료되어 다시 시작합니다. (종료 코드: %s)", self.index, code)
+            self.start()
+
+    def stop(self):
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+
+    def wait(self, timeout: float):
+        try:
+            self.process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+def partition_key(update: dict) -> int:
+    # 업데이트 종류(message, callback_query, inline_query 등)에 관계없이 채팅방 ID를, 없으면 사용자 ID를 사용
+    for value in update.values():
+        if not isinstance(value, dict):
+            continue
+        for source in (value, value.get("message")):
+            if isinstance(source, dict) and isinstance(source.get("chat"), dict):
+                return source["chat"]["id"]
+        if isinstance(value.get("from"), dict):
+            return value["from"]["id"]
+    return update.get("update_id", 0)
+
+
+def make_handler(workers):
+    class WebhookHandler(http.server.BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path.split("?")[0].strip("/") != WEBHOOK_PATH.strip("/"):
+                self.send_error(404)
+                return
+            body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            try:
+                key = partition_key(json.loads(body))
+            except (ValueError, AttributeError):
+                self.send_error(400)
+                return
+            worker = workers[key % len(workers)]
+            # 비밀 토큰 확인은 워커(run_webhook)가 하므로 헤더를 그대로 전달
+            headers = {"Content-Type": "application/json"}
+            if self.headers.get(SECRET_HEADER) is not None:
+                headers[SECRET_HEADER] = self.headers[SECRET_HEADER]
+            request = urllib.request.Request(
+                f"http://127.0.0.1:{worker.port}/{WEBHOOK_PATH}", data=body, headers=headers
+            )
+            try:
+                with urllib.request.urlopen(request, timeout=FORWARD_TIMEOUT_SECONDS) as response:
+                    status, payload = response.status, response.read()
+            except urllib.error.HTTPError as e:
+                status, payload = e.code, e.read()
+            except (urllib.error.URLError, OSError) as e:
+                # 워커가 시작 중이거나 재시작 중이면 503을 돌려 텔레그램이 나중에 다시 보내게 함
+                logger.warning("워커 %d에 전달 실패: %s", worker.index, e)
+                self.send_error(503)
+                return
+            self.send_response(status)
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, format, *args):
+            logger.debug("%s - " + format, self.address_string(), *args)
+
+    return WebhookHandler
+
+
+def main():
+    if WORKER_COUNT < 1:
+        logger.error("BOT_WORKERS는 1 이상이어야 합니다. (현재: %d)", WORKER_COUNT)
+        exit()
+    workers = [Worker(i) for i in range(WORKER_COUNT)]
+    # 포트를 먼저 열어 두어 실패하면 워커를 띄우지 않고 바로 종료
+    server = http.server.ThreadingHTTPServer(("0.0.0.0", PORT), make_handler(workers))
+    for worker in workers:
+        worker.start()
+    stopping = threading.Event()
+
+    def supervise():
+        while not stopping.wait(RESTART_CHECK_SECONDS):
+            for worker in workers:
+                worker.restart_if_exited()
+
+    def handle_signal(signum, frame):
+        # serve_forever가 도는 스레드에서 shutdown을 직접 부르면 멈추므로 별도 스레드에서 호출
+        stopping.set()
+        threading.Thread(target=server.shutdown, daemon=True).start()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+    threading.Thread(target=supervise, name="worker-supervisor", daemon=True).start()
+
+    logger.info("웹훅 앞단 시작 (포트: %d, 워커 %d개)", PORT, WORKER_COUNT)
+    try:
+        server.serve_forever()
+    finally:
+        stopping.set()
+        server.server_close()
+        for worker in workers:
+            worker.stop()
+        for worker in workers:
+            worker.wait(10)
+        logger.info("모든 워커를 종료했습니다.")
+
+
+if __name__ == "__main__":
+    main()
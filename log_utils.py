@@ -0,0 +1,125 @@
+import atexit
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+
+# 로그 포맷 (기존 basicConfig와 동일)
+TEXT_LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+# LogRecord 기본 속성 (JSON 로그에서 extra 필드만 골라내기 위해 사용)
+_RESERVED_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+# 현재 동작 중인 큐 리스너 (프로세스 종료 시 남은 로그를 모두 출력하고 정리)
+_listener = None
+
+
+class Truncated:
+    """로그에 남길 큰 값(응답 본문 등)을 출력 시점에만 잘라서 문자열로 만듭니다."""
+
+    __slots__ = ("value", "limit")
+
+    def __init__(self, value, limit: int):
+        self.value = value
+        self.limit = limit
+
+    def __str__(self):
+        text = str(self.value)
+        if len(text) <= self.limit:
+            return text
+        return f"{text[:self.limit]}...({len(text) - self.limit}자 생략)"
+
+    __repr__ = __str__
+
+
+class SamplingFilter(logging.Filter):
+    """extra={"sampled": True}로 표시된 고빈도 로그를 메시지 종류별로 N개 중 1개만 통과시킵니다."""
+
+    def __init__(self, rate: int):
+        super().__init__()
+        self.rate = max(1, rate)
+        self.counters = {}
+
+    def filter(self, record):
+        if self.rate == 1 or not getattr(record, "sampled", False):
+            return True
+        # 같은 메시지 템플릿끼리 카운트하여 결정적으로 샘플링 (경고 이상은 항상 통과)
+        if record.levelno >= logging.WARNING:
+            return True
+        counter = self.counters.get(record.msg)
+        if counter is None:
+            counter = self.counters[record.msg] = itertools.count()
+        return next(counter) % self.rate == 0
+
+
+class JsonFormatter(logging.Formatter):
+    """한 줄에 하나의 JSON 객체로 로그를 출력합니다. extra로 넘긴 필드도 함께 기록됩니다."""
+
+    def format(self, record):
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_RECORD_ATTRS and key != "sampled":
+                entry[key] = value
+        if record.exc_info:
+            entry["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class DeferredQueueHandler(logging.handlers.QueueHandler):
+    """기본 QueueHandler와 달리 메시지 포맷팅을 호출 스레드가 아닌 리스너 스레드로 미룹니다."""
+
+    def prepare(self, record):
+        # 같은 프로세스 안의 큐이므로 레코드를 그대로 넘겨도 안전
+        return record
+
+
+def setup_logging(level=logging.INFO, log_format: str = "text", sample_rate: int = 1,
+                  use_queue: bool = False, stream=None):
+    """루트 로거를 설정합니다. use_queue가 켜져 있으면 포맷팅과 출력은 별도 스레드에서 처리됩니다.
+
+    큐는 출력 대상이 느리거나 막힐 때(파이프, 원격 수집기 등) 호출 쪽 지연을 줄여 주지만,
+    일반적인 stderr 출력에서는 스레드 간 전달 비용 때문에 오히려 느려지므로 기본값은 꺼 둡니다.
+    """
+    output_handler = logging.StreamHandler(stream or sys.stderr)
+    if log_format == "json":
+        output_handler.setFormatter(JsonFormatter())
+    else:
+        output_handler.setFormatter(logging.Formatter(TEXT_LOG_FORMAT))
+
+    shutdown_logging()
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.setLevel(level)
+
+    global _listener
+    if use_queue:
+        # 호출하는 쪽(이벤트 루프)에서는 레코드를 큐에 넣기만 하고 바로 반환
+        log_queue = queue.SimpleQueue()
+        handler = DeferredQueueHandler(log_queue)
+        _listener = logging.handlers.QueueListener(log_queue, output_handler, respect_handler_level=True)
+        _listener.start()
+    else:
+        handler = output_handler
+
+    # 샘플링은 큐에 넣기 전에 적용하여 버려질 레코드의 비용을 줄임
+    handler.addFilter(SamplingFilter(sample_rate))
+    root.addHandler(handler)
+
+
+def shutdown_logging():
+    """큐에 남은 로그를 모두 출력하고 리스너 스레드를 종료합니다."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
@@ -0,0 +1,266 @@
+import collections
+import cProfile
+import datetime
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import tracemalloc
+
+# cpu: cProfile + 스택 샘플링(플레임그래프용), alloc: tracemalloc 메모리 할당 추적, all: 둘 다
+PROFILE_MODES = ("cpu", "alloc", "all")
+
+# 스레드가 아무 일도 하지 않고 대기 중인 샘플은 플레임그래프에서 제외 (가장 안쪽 프레임 기준)
+_IDLE_FRAMES = {
+    ("selectors.py", "select"),   # 이벤트 루프 대기
+    ("threading.py", "wait"),     # 락/조건 변수 대기
+    ("queue.py", "get"),          # 작업 큐 대기
+    ("thread.py", "_worker"),     # 스레드 풀 작업자 대기 (asyncio.to_thread)
+    ("handlers.py", "dequeue"),   # 로그 큐 리스너 대기
+}
+
+# 할당 요약에서 이 디렉터리 아래의 프레임을 "우리 코드"로 보고 그 함수에 할당을 귀속시킴
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# 현재 진행 중인 프로파일링 세션 (프로세스당 하나)
+_session = None
+
+
+class StackSampler(threading.Thread):
+    """모든 스레드의 호출 스택을 주기적으로 수집하여 folded 형식(플레임그래프 입력)으로 집계합니다.
+
+    스택 맨 앞에 스레드 이름을 붙이므로 이벤트 루프와 asyncio.to_thread 작업 스레드가 구분됩니다.
+    """
+
+    def __init__(self, interval: float):
+        super().__init__(name="stack-sampler", daemon=True)
+        self.interval = interval
+        self.counts = collections.Counter()
+        self._stop_event = threading.Event()
+
+    def run(self):
+        while not self._stop_event.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == self.ident:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE_FRAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                # 스레드 풀 작업자(asyncio_0, asyncio_1, ...)는 하나로 묶음
+                thread_name = re.sub(r"_\d+$", "", names.get(thread_id, str(thread_id)))
+                stack.append(f"thread:{thread_name}")
+                self.counts[";".join(reversed(stack))] += 1
+
+    def stop(self):
+        self._stop_event.set()
+        self.join()
+
+    def write_folded(self, path: str):
+        # flamegraph.pl, speedscope 등에서 바로 읽을 수 있는 "스택 샘플수" 형식
+        with open(path, "w", encoding="utf-8") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class ProfilingSession:
+    """지정한 모드로 프로파일링을 시작하고, 종료 시 결과 파일을 output_dir에 기록합니다."""
+
+    def __init__(self, mode: str, output_dir: str, label: str = "", interval: float = 0.01, top: int = 50):
+        if mode not in PROFILE_MODES:
+            raise ValueError(f"알 수 없는 프로파일링 모드입니다: {mode}")
+        self.mode = mode
+        self.output_dir = output_dir
+        self.interval = interval
+        self.top = top
+        started = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+        self.prefix = os.path.join(output_dir, f"{started}-{label}" if label else started)
+        self.profiler = None
+        self.sampler = None
+        self.start_snapshot = None
+        self.started_tracemalloc = False
+        # profiled_call로 다른 스레드에서 측정한 cProfile 결과 (종료 시 합침)
+        self.thread_profiles = []
+        self._lock = threading.Lock()
+
+    def start(self):
+        # cProfile은 호출한 스레드(이벤트 루프)를 측정하고, 스레드로 넘긴 작업은 profiled_call이 측정
+        if self.mode in ("cpu", "all"):
+            self.sampler = StackSampler(self.interval)
+            self.sampler.start()
+            self.profiler = cProfile.Profile()
+            self.profiler.enable()
+        if self.mode in ("alloc", "all"):
+            if not tracemalloc.is_tracing():
+                # 할당을 우리 코드의 함수에 귀속시키려면 stdlib(json, ssl 등) 위의 호출자까지 필요
+                tracemalloc.start(25)
+                self.started_tracemalloc = True
+            self.start_snapshot = tracemalloc.take_snapshot()
+
+    def add_thread_profile(self, profile):
+        with self._lock:
+            self.thread_profiles.append(profile)
+
+    def stop(self):
+        # 측정부터 모두 멈춘 뒤에 파일을 씀
+        # (파일 쓰기가 실패해도 프로파일러가 켜진 채로 남지 않고, 결과 기록 중의 할당이 메모리 요약에 섞이지 않음)
+        snapshot = None
+        if self.start_snapshot is not None:
+            snapshot = tracemalloc.take_snapshot()
+            if self.started_tracemalloc:
+                tracemalloc.stop()
+        stats = None
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.sampler.stop()
+            stats = pstats.Stats(self.profiler)
+            with self._lock:
+                for profile in self.thread_profiles:
+                    stats.add(profile)
+
+        os.makedirs(self.output_dir, exist_ok=True)
+        paths = []
+        if stats is not None:
+            paths.append(self.prefix + ".prof")
+            stats.dump_stats(paths[-1])
+            paths.append(self.prefix + "-cpu.txt")
+            self._write_cpu_summary(stats, paths[-1])
+            paths.append(self.prefix + ".folded")
+            self.sampler.write_folded(paths[-1])
+        if snapshot is not None:
+            paths.append(self.prefix + "-alloc.txt")
+            self._write_alloc_summary(snapshot, paths[-1])
+        return paths
+
+    def _write_cpu_summary(self, stats, path: str):
+        stream = io.StringIO()
+        stats.stream = stream
+        stats.sort_stats("cumulative").print_stats(self.top)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(stream.getvalue())
+
+    def _write_alloc_summary(self, snapshot, path: str):
+        filters = (
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+            tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        )
+        diffs = snapshot.filter_traces(filters).compare_to(self.start_snapshot.filter_traces(filters), "traceback")
+
+        # 각 할당을 가장 안쪽의 프로젝트 프레임(없으면 가장 안쪽 프레임)에 귀속시켜 함수/줄 단위로 묶음
+        # 실제로 할당한 가장 안쪽 프레임(json, ssl 등)은 보조 정보로 함께 기록
+        per_function = collections.defaultdict(lambda: [0, 0, collections.Counter()])
+        per_line = collections.defaultdict(lambda: [0, 0])
+        for diff in diffs:
+            if diff.size_diff <= 0:
+                continue
+            innermost = diff.traceback[-1]
+            owner = _project_frame(diff.traceback) or innermost
+            totals = per_function[_function_name(owner.filename, owner.lineno)]
+            totals[0] += diff.size_diff
+            totals[1] += diff.count_diff
+            totals[2][_function_name(innermost.filename, innermost.lineno)] += diff.size_diff
+            line_totals = per_line[f"{owner.filename}:{owner.lineno}"]
+            line_totals[0] += diff.size_diff
+            line_totals[1] += diff.count_diff
+
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("# 함수별 메모리 할당 증가량 (프로파일링 구간 동안, 프로젝트 함수 기준)\n")
+            f.write("# 크기  블록 수  함수  <-  가장 많이 할당한 안쪽 함수\n")
+            ranked = sorted(per_function.items(), key=lambda item: item[1][0], reverse=True)
+            for name, (size, count, inner) in ranked[:self.top]:
+                top_inner = inner.most_common(1)[0][0]
+                suffix = "" if top_inner == name else f"  <-  {top_inner}"
+                f.write(f"{size / 1024:12.1f} KiB {count:10d} blocks  {name}{suffix}\n")
+            f.write("\n# 줄별 메모리 할당 증가량 (프로젝트 코드 줄 기준)\n")
+            ranked = sorted(per_line.items(), key=lambda item: item[1][0], reverse=True)
+            for location, (size, count) in ranked[:self.top]:
+                f.write(f"{size / 1024:12.1f} KiB {count:10d} blocks  {location}\n")
+
+
+def _project_frame(traceback):
+    # tracemalloc 트레이스백은 바깥쪽 -> 안쪽 순서이므로 뒤에서부터 찾음
+    for frame in reversed(traceback):
+        if frame.filename.startswith(PROJECT_DIR + os.sep):
+            return frame
+    return None
+
+
+_code_index = {}
+
+
+def _function_name(filename: str, lineno: int) -> str:
+    # tracemalloc은 파일/줄 번호만 제공하므로 소스를 컴파일해 해당 줄을 포함하는 가장 안쪽 함수를 찾음
+    if filename not in _code_index:
+        codes = []
+        try:
+            with open(filename, encoding="utf-8") as f:
+                pending = [compile(f.read(), filename, "exec")]
+        except (OSError, SyntaxError, UnicodeDecodeError, ValueError):
+            pending = []
+        while pending:
+            code = pending.pop()
+            lines = [line for _, _, line in code.co_lines() if line is not None]
+            if lines:
+                codes.append((min(lines), max(lines), code.co_qualname if hasattr(code, "co_qualname") else code.co_name))
+            pending.extend(const for const in code.co_consts if hasattr(const, "co_lines"))
+        _code_index[filename] = codes
+
+    best = None
+    for first, last, name in _code_index[filename]:
+        if first <= lineno <= last and (best is None or last - first < best[1] - best[0]):
+            best = (first, last, name)
+    function = best[2] if best else "?"
+    return f"{function} ({os.path.basename(filename)})"
+
+
+def start_profiling(mode: str, output_dir: str, label: str = "", interval: float = 0.01):
+    """프로파일링을 시작합니다. 이미 진행 중이면 RuntimeError를 발생시킵니다."""
+    global _session
+    if _session is not None:
+        raise RuntimeError("이미 프로파일링이 진행 중입니다.")
+    session = ProfilingSession(mode, output_dir, label, interval)
+    session.start()
+    _session = session
+    return session
+
+
+def stop_profiling():
+    """진행 중인 프로파일링을 끝내고 기록한 파일 경로 목록을 반환합니다. 진행 중이 아니면 None."""
+    global _session
+    if _session is None:
+        return None
+    session, _session = _session, None
+    return session.stop()
+
+
+def profiled_call(func, *args):
+    """func(*args)를 실행합니다. cpu 프로파일링 중이면 이 스레드에서의 실행도 측정해 결과에 합칩니다.
+
+    cProfile은 enable()을 호출한 스레드만 기록하므로, asyncio.to_thread 등으로 넘긴 작업은 이 함수를 거쳐야 합니다.
+    """
+    session = _session
+    if session is None or session.profiler is None:
+        return func(*args)
+    profile = cProfile.Profile()
+    try:
+        profile.enable()
+    except ValueError:
+        # Python 3.12+는 프로파일러가 하나만 켜질 수 있고, 이미 켜진 프로파일러가 모든 스레드를 기록함
+        return func(*args)
+    try:
+        return func(*args)
+    finally:
+        profile.disable()
+        session.add_thread_profile(profile)
+
+
+def is_profiling() -> bool:
+    return _session is not None